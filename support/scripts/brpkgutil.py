@@ -1,11 +1,116 @@
 # Copyright (C) 2010-2013 Thomas Petazzoni <thomas.petazzoni@free-electrons.com>
 # Copyright (C) 2019 Yann E. MORIN <yann.morin.1998@free.fr>
 
+import hashlib
 import json
 import logging
 import os
+import re
 import subprocess
-from collections import defaultdict
+import time
+from array import array
+from collections import defaultdict, deque
+
+
+# The top of the Buildroot tree this script belongs to
+TOPDIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Name of the file, next to the .config, in which the parsed output of
+# 'make show-info' is cached.
+SHOW_INFO_CACHE = ".show-info-cache.json"
+
+# Sub-directories of the Buildroot tree that contain the .mk and
+# Config.in files that make up the packages definitions.
+SHOW_INFO_SUBDIRS = ["arch", "boot", "fs", "linux", "package", "support",
+                     "system", "toolchain"]
+
+BR2_EXTERNAL_PATH_RE = re.compile(r'^BR2_EXTERNAL_[A-Za-z0-9_]+_PATH="(.*)"$')
+
+
+# Feeds the hash object h with the name, size and modification time of
+# all the .mk and Config.in* files in dirs (searched recursively).
+def hash_pkg_files(h, topdir, dirs):
+    for d in dirs:
+        for root, subdirs, files in os.walk(os.path.join(topdir, d)):
+            subdirs.sort()
+            for f in sorted(files):
+                if not (f.endswith(".mk") or f.startswith("Config.in")
+                        or f == "external.desc"):
+                    continue
+                fpath = os.path.join(root, f)
+                st = os.stat(fpath)
+                h.update(("%s:%d:%r\n" % (fpath, st.st_size, st.st_mtime)).encode())
+
+
+# This function returns a digest of everything the output of 'make
+# show-info' depends on: the .config, and the .mk and Config.in files of
+# Buildroot and of all the BR2_EXTERNAL trees in use. Files are
+# identified by their size and modification time, so that computing the
+# digest does not need to read them all.
+# Returns None if there is no .config in the current directory.
+def get_show_info_digest():
+    h = hashlib.sha1()
+    h.update(TOPDIR.encode())
+    externals = []
+    try:
+        with open(".config", "rb") as f:
+            for line in f:
+                h.update(line)
+                m = BR2_EXTERNAL_PATH_RE.match(line.decode("utf-8", "replace").strip())
+                if m:
+                    externals.append(m.group(1))
+    except (IOError, OSError):
+        return None
+    for f in ["Makefile", "Config.in", "Config.in.legacy"]:
+        st = os.stat(os.path.join(TOPDIR, f))
+        h.update(("%s:%d:%r\n" % (f, st.st_size, st.st_mtime)).encode())
+    hash_pkg_files(h, TOPDIR, SHOW_INFO_SUBDIRS)
+    for ext in externals:
+        hash_pkg_files(h, ext, ["."])
+    return h.hexdigest()
+
+
+# This function returns the parsed output of 'make show-info', as a
+# dictionary using package names as keys.
+#
+# The result is cached on disk, and the cache is reused as long as none
+# of the files 'make show-info' depends on changed (see
+# get_show_info_digest()). When refresh is True, the cache is ignored
+# and re-generated.
+def get_show_info(refresh=False):
+    start = time.time()
+    digest = get_show_info_digest()
+
+    if digest is not None and not refresh:
+        try:
+            with open(SHOW_INFO_CACHE) as f:
+                cache = json.load(f)
+            if cache["digest"] == digest:
+                logging.info("show-info cache hit, loaded in %.2fs" % (time.time() - start))
+                return cache["show-info"]
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+    cmd = ["make", "-s", "--no-print-directory", "show-info"]
+    with open(os.devnull, 'wb') as devnull:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=devnull,
+                             universal_newlines=True)
+        pkg_list = json.loads(p.communicate()[0])
+
+    # Write to a temporary file first, so that concurrent readers never
+    # see a partial cache.
+    if digest is not None:
+        tmpfile = "%s.%d" % (SHOW_INFO_CACHE, os.getpid())
+        try:
+            with open(tmpfile, "w") as f:
+                json.dump({"digest": digest, "show-info": pkg_list}, f)
+            os.rename(tmpfile, SHOW_INFO_CACHE)
+        except (IOError, OSError) as e:
+            logging.warning("Could not write show-info cache: %s" % e)
+
+    logging.info("show-info cache %s, loaded in %.2fs" %
+                 ("refresh" if refresh else "miss", time.time() - start))
+    return pkg_list
 
 
 # This function returns a tuple of four dictionaries, all using package
@@ -17,7 +122,7 @@ from collections import defaultdict
 # - a dictionary which values are the type of the package used as key;
 # - a dictionary which values are the version of the package used as key,
 #   'virtual' for a virtual package, or the empty string for a rootfs.
-def get_dependency_tree():
+def get_dependency_tree(refresh=False):
     logging.info("Getting dependency tree...")
 
     deps = {}
@@ -30,11 +135,7 @@ def get_dependency_tree():
     types['all'] = 'target'
     versions['all'] = ''
 
-    cmd = ["make", "-s", "--no-print-directory", "show-info"]
-    with open(os.devnull, 'wb') as devnull:
-        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=devnull,
-                             universal_newlines=True)
-        pkg_list = json.loads(p.communicate()[0])
+    pkg_list = get_show_info(refresh)
 
     for pkg in pkg_list:
         deps['all'].append(pkg)
@@ -48,3 +149,157 @@ def get_dependency_tree():
             else pkg_list[pkg]["version"]
 
     return (deps, rdeps, types, versions)
+
+
+# A node of the DependencyGraph: the id of a package, its name, its type
+# ('target', 'host' or 'rootfs'), its version ('virtual' for a virtual
+# package, None for a rootfs).
+class DependencyNode(object):
+    __slots__ = ["id", "name", "type", "version"]
+
+    def __init__(self, id, name, type=None, version=None):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.version = version
+
+    def __repr__(self):
+        return "DependencyNode(%d, %r)" % (self.id, self.name)
+
+
+# A compact, read-only representation of the dependency graph, built
+# from the output of 'make show-info'.
+#
+# Each package name is interned to an integer id, which indexes the
+# list of nodes. The forward (dependencies) and reverse (reverse
+# dependencies) edges are stored as compressed sparse rows: the
+# neighbours of package i are edges[index[i]:index[i + 1]], with index
+# and edges both being arrays of unsigned integers.
+#
+# All the query methods take and return package names; the methods with
+# an _ids suffix work directly on ids.
+class DependencyGraph(object):
+    def __init__(self, pkg_list):
+        self.nodes = []
+        self.ids = {}
+        for pkg in pkg_list:
+            info = pkg_list[pkg]
+            version = None if info["type"] == "rootfs" \
+                else "virtual" if info["virtual"] \
+                else info["version"]
+            self.nodes.append(DependencyNode(len(self.nodes), pkg, info["type"], version))
+            self.ids[pkg] = self.nodes[-1].id
+        edges = []
+        for pkg in pkg_list:
+            src = self.ids[pkg]
+            for d in pkg_list[pkg].get("dependencies", []):
+                if d not in self.ids:
+                    self.ids[d] = len(self.nodes)
+                    self.nodes.append(DependencyNode(len(self.nodes), d))
+                edges.append((src, self.ids[d]))
+        self.fwd_index, self.fwd_edges = self._csr(edges)
+        self.rev_index, self.rev_edges = self._csr([(d, s) for s, d in edges])
+
+    def _csr(self, edges):
+        index = array('I', [0] * (len(self.nodes) + 1))
+        for src, _ in edges:
+            index[src + 1] += 1
+        for i in range(len(self.nodes)):
+            index[i + 1] += index[i]
+        fill = array('I', index)
+        targets = array('I', [0] * len(edges))
+        for src, dst in edges:
+            targets[fill[src]] = dst
+            fill[src] += 1
+        return index, targets
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return (n.name for n in self.nodes)
+
+    def node(self, name):
+        return self.nodes[self.ids[name]]
+
+    def deps_ids(self, i):
+        return self.fwd_edges[self.fwd_index[i]:self.fwd_index[i + 1]]
+
+    def rdeps_ids(self, i):
+        return self.rev_edges[self.rev_index[i]:self.rev_index[i + 1]]
+
+    # Returns the set of ids reachable from the ids in start, following
+    # the edges described by index and edges; the starting ids are not
+    # part of the result, unless they are part of a loop.
+    def _reachable_ids(self, start, index, edges):
+        seen = set()
+        todo = list(start)
+        while todo:
+            i = todo.pop()
+            for j in edges[index[i]:index[i + 1]]:
+                if j not in seen:
+                    seen.add(j)
+                    todo.append(j)
+        return seen
+
+    def descendants_ids(self, ids):
+        return self._reachable_ids(ids, self.fwd_index, self.fwd_edges)
+
+    def ancestors_ids(self, ids):
+        return self._reachable_ids(ids, self.rev_index, self.rev_edges)
+
+    # Returns the list of the direct dependencies of package name
+    def deps(self, name):
+        return [self.nodes[i].name for i in self.deps_ids(self.ids[name])]
+
+    # Returns the list of the direct reverse dependencies of package name
+    def rdeps(self, name):
+        return [self.nodes[i].name for i in self.rdeps_ids(self.ids[name])]
+
+    # Returns the set of all the dependencies, direct or transitive, of
+    # package name
+    def descendants(self, name):
+        return set(self.nodes[i].name for i in self.descendants_ids([self.ids[name]]))
+
+    # Returns the set of all the packages that depend, directly or
+    # transitively, on package name
+    def ancestors(self, name):
+        return set(self.nodes[i].name for i in self.ancestors_ids([self.ids[name]]))
+
+    # Iterates over the package ids, each package coming after all its
+    # dependencies (or before them, if reverse is True). Raises a
+    # ValueError if the graph has a loop, once all the packages not
+    # part of (or depending on) that loop have been returned.
+    def topological_order_ids(self, reverse=False):
+        if reverse:
+            index, edges = self.fwd_index, self.fwd_edges
+            rindex = self.rev_index
+        else:
+            index, edges = self.rev_index, self.rev_edges
+            rindex = self.fwd_index
+        pending = array('I', [rindex[i + 1] - rindex[i] for i in range(len(self.nodes))])
+        todo = deque(i for i in range(len(self.nodes)) if pending[i] == 0)
+        done = 0
+        while todo:
+            i = todo.popleft()
+            done += 1
+            yield i
+            for j in edges[index[i]:index[i + 1]]:
+                pending[j] -= 1
+                if pending[j] == 0:
+                    todo.append(j)
+        if done != len(self.nodes):
+            raise ValueError("the dependency graph has a loop")
+
+    def topological_order(self, reverse=False):
+        return (self.nodes[i].name for i in self.topological_order_ids(reverse))
+
+
+# This function returns a DependencyGraph of all the packages in the
+# current configuration. See get_show_info() for the refresh parameter.
+def get_dependency_graph(refresh=False):
+    logging.info("Getting dependency graph...")
+    return DependencyGraph(get_show_info(refresh))
@@ -0,0 +1,261 @@
+# Matching of the packages against the CVEs (Common Vulnerabilities and
+# Exposures) of the JSON feeds of the NVD (National Vulnerability
+# Database), downloaded beforehand from https://nvd.nist.gov/vuln/data-feeds
+# in a directory, e.g.:
+#
+#   nvd/nvdcve-1.1-2002.json.gz
+#   ...
+#   nvd/nvdcve-1.1-2020.json.gz
+#   nvd/nvdcve-1.1-modified.json.gz
+#
+#   import cve
+#   index = cve.CVEIndex("nvd", products=["busybox"])
+#   print(index.match("busybox", "1.31.1", vendor="busybox"))
+#
+# The feeds are parsed as a stream, one CVE at a time, and only the
+# data needed to match the packages is kept: for each CVE, the list of
+# the CPE (Common Platform Enumeration) vendor, product and version
+# (or range of versions) that it affects. That data is cached for each
+# feed in the index/ sub-directory, so that only the feeds that changed
+# since the previous run (usually the ones of the current year, and the
+# modified and recent feeds) are parsed again.
+#
+# A CVE found in several feeds is taken from the last one, in this
+# order: the yearly feeds, the recent feed and the modified feed. This
+# way, the modified feed can be downloaded more often than the others.
+#
+# Limitations
+#
+#  * The CPE product must be the name of the package.
+#
+#  * The packages are matched by CPE vendor and product when their
+#    vendor is known (see the <PKG>_CPE_VENDOR variable of the packages).
+#    Otherwise, they are matched by CPE product only, against the CPEs
+#    of all the vendors: the matches are then unverified, as another
+#    software of the same name, by another vendor, may be the one
+#    affected.
+#
+#  * The versions are compared by their numeric and alphabetic parts,
+#    e.g. 1.2rc1 is considered more recent than 1.2.
+#
+#  * All the CPEs of a CVE are considered, even those which are only
+#    affected in combination with another one (e.g. an application on
+#    a given operating system).
+
+import gzip
+import json
+import os
+import re
+from collections import defaultdict
+from multiprocessing import Pool
+
+NVD_FEED_RE = re.compile(r"^nvdcve-1\.1-(\d{4}|recent|modified)\.json(\.gz)?$")
+
+# Version of the format of the index of the feeds
+INDEX_VERSION = 1
+
+# Sub-directory of the feeds directory where their index is cached
+INDEX_DIR = "index"
+
+# Size of the chunks in which the feeds are read
+READ_SIZE = 1 << 20
+
+CPE_SPLIT_RE = re.compile(r"(?<!\\):")
+CPE_UNQUOTE_RE = re.compile(r"\\(.)")
+VERSION_PART_RE = re.compile(r"\d+|[a-z]+")
+
+
+# Yields the items of the array which is the value of key in the JSON
+# document read from the file f, without reading the whole document.
+def iter_json_array(f, key):
+    decoder = json.JSONDecoder()
+    buf = ""
+    start = -1
+    while start < 0:
+        chunk = f.read(READ_SIZE)
+        if not chunk:
+            return
+        buf += chunk
+        i = buf.find('"%s"' % key)
+        if i >= 0:
+            start = buf.find("[", i)
+    pos = start + 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            if pos == len(buf):
+                raise ValueError("end of buffer")
+            item, pos = decoder.raw_decode(buf, pos)
+        except ValueError:
+            # The item is not complete yet
+            if eof:
+                raise
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+
+# Yields the vulnerable CPE matches of the configuration nodes of a CVE,
+# and of their children.
+def iter_cpe_matches(nodes):
+    for node in nodes:
+        for m in node.get("cpe_match", []):
+            if m.get("vulnerable"):
+                yield m
+        for m in iter_cpe_matches(node.get("children", [])):
+            yield m
+
+
+# Returns the list of the [vendor, product, version, start including,
+# start excluding, end including, end excluding] affected by a CVE
+# item of a feed. The version is "*" for a range of versions.
+def parse_cve_item(item):
+    entries = []
+    for m in iter_cpe_matches(item.get("configurations", {}).get("nodes", [])):
+        uri = m["cpe23Uri"]
+        if "\\" in uri:
+            fields = [CPE_UNQUOTE_RE.sub(r"\1", f) for f in CPE_SPLIT_RE.split(uri)]
+        else:
+            fields = uri.split(":")
+        vendor, product, version, update = fields[3:7]
+        if version == "-":
+            version = "*"
+        if update not in ["*", "-", ""]:
+            version += update
+        entries.append([vendor, product, version,
+                        m.get("versionStartIncluding"), m.get("versionStartExcluding"),
+                        m.get("versionEndIncluding"), m.get("versionEndExcluding")])
+    return entries
+
+
+def open_feed(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+# Parses the feed in path, and writes its index (the entries of all its
+# CVEs, see parse_cve_item()) in indexpath.
+def index_feed(args):
+    path, indexpath = args
+    cves = dict()
+    with open_feed(path) as f:
+        for item in iter_json_array(f, "CVE_Items"):
+            cves[item["cve"]["CVE_data_meta"]["ID"]] = parse_cve_item(item)
+    tmpfile = "%s.%d" % (indexpath, os.getpid())
+    with open(tmpfile, "w") as f:
+        f.write(json.dumps(cves, separators=(",", ":")))
+    os.rename(tmpfile, indexpath)
+
+
+# Returns the names of the feeds in nvd_path, in the order in which they
+# must be processed.
+def get_feeds(nvd_path):
+    def order(fname):
+        kind = NVD_FEED_RE.match(fname).group(1)
+        if kind.isdigit():
+            return (0, int(kind))
+        return (1, ["recent", "modified"].index(kind))
+    return sorted((f for f in os.listdir(nvd_path) if NVD_FEED_RE.match(f)), key=order)
+
+
+def feed_digest(path):
+    st = os.stat(path)
+    return "%d:%d" % (st.st_size, st.st_mtime_ns)
+
+
+def version_key(version):
+    return tuple((1, int(p), "") if p.isdigit() else (0, 0, p)
+                 for p in VERSION_PART_RE.findall(version.lower()))
+
+
+# Returns the version keys of an entry (see parse_cve_item()): the key
+# of its version (None for a range of versions), and of the bounds of
+# its range (None for the unset ones).
+def entry_keys(entry):
+    return tuple(None if v is None or v == "*" else version_key(v)
+                 for v in [entry[2]] + entry[3:])
+
+
+# Returns whether the version which key is key is affected by an entry,
+# which keys are keys (see entry_keys()).
+def version_matches(key, keys):
+    exact, start_incl, start_excl, end_incl, end_excl = keys
+    if exact is not None:
+        return exact == key
+    if start_incl is not None and key < start_incl:
+        return False
+    if start_excl is not None and key <= start_excl:
+        return False
+    if end_incl is not None and key > end_incl:
+        return False
+    if end_excl is not None and key >= end_excl:
+        return False
+    return True
+
+
+class CVEIndex:
+    # Loads the index of the feeds in nvd_path, for the CPE products in
+    # products (or for all of them if None), parsing the feeds that
+    # changed since their index was cached. The entries of the CVEs are
+    # indexed by CPE (vendor, product).
+    def __init__(self, nvd_path, products=None):
+        indexdir = os.path.join(nvd_path, INDEX_DIR)
+        if not os.path.isdir(indexdir):
+            os.mkdir(indexdir)
+        manifest_path = os.path.join(indexdir, "manifest.json")
+        manifest = dict()
+        try:
+            with open(manifest_path) as f:
+                data = json.load(f)
+            if data["version"] == INDEX_VERSION:
+                manifest = data["feeds"]
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        feeds = get_feeds(nvd_path)
+        digests = dict((feed, feed_digest(os.path.join(nvd_path, feed))) for feed in feeds)
+        self.feeds = feeds
+        self.parsed = [feed for feed in feeds if manifest.get(feed) != digests[feed] or
+                       not os.path.exists(os.path.join(indexdir, feed + ".json"))]
+        if self.parsed:
+            pool = Pool()
+            pool.map(index_feed, [(os.path.join(nvd_path, feed), os.path.join(indexdir, feed + ".json"))
+                                  for feed in self.parsed])
+            pool.close()
+            pool.join()
+            manifest = dict((feed, digests[feed]) for feed in feeds)
+            tmpfile = "%s.%d" % (manifest_path, os.getpid())
+            with open(tmpfile, "w") as f:
+                json.dump({"version": INDEX_VERSION, "feeds": manifest}, f)
+            os.rename(tmpfile, manifest_path)
+
+        # The CVEs of the later feeds replace those of the earlier ones
+        cves = dict()
+        for feed in feeds:
+            with open(os.path.join(indexdir, feed + ".json")) as f:
+                for cve, entries in json.load(f).items():
+                    cves[cve] = [e for e in entries if products is None or e[1] in products]
+        self.ncves = len(cves)
+        self.cpes = defaultdict(list)
+        self.vendors = defaultdict(set)
+        for cve, entries in cves.items():
+            for e in entries:
+                self.cpes[(e[0], e[1])].append((cve, entry_keys(e)))
+                self.vendors[e[1]].add(e[0])
+
+    # Returns the sorted list of the CVEs affecting the given version of
+    # the CPE product of vendor, or of the CPE product of any vendor if
+    # vendor is None (see the limitations above).
+    def match(self, product, version, vendor=None):
+        key = version_key(version)
+        vendors = self.vendors.get(product, []) if vendor is None else [vendor]
+        return sorted(set(cve for v in vendors for cve, keys in self.cpes.get((v, product), [])
+                          if version_matches(key, keys)))
@@ -0,0 +1,142 @@
+# Size of the sections of ELF files, by category (code, read-only data,
+# data, etc.), read from their section headers without any external
+# tool, e.g.:
+#
+#   import elfsize
+#   sizes = elfsize.get_elf_sizes("output/target/bin/busybox")
+#   if sizes is not None:
+#       print(sizes["text"], sizes["debug"])
+#
+# The files are mapped in memory, and only their ELF header, their
+# section headers and the names of their sections are read.
+
+import mmap
+import struct
+
+ELF_MAGIC = b"\x7fELF"
+
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+SHT_NULL = 0
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+
+SHN_XINDEX = 0xffff
+
+# The categories of the sections:
+# - text: the code;
+# - rodata: the read-only data (including the other read-only sections
+#   loaded in memory, e.g. .dynsym or .eh_frame);
+# - data: the writable data;
+# - bss: the zero-initialized data, which take no space in the file;
+# - debug: the debugging information;
+# - symtab: the symbol table, and its string table;
+# - other: the sections not loaded in memory (e.g. .comment).
+CATEGORIES = ["text", "rodata", "data", "bss", "debug", "symtab", "other"]
+
+DEBUG_PREFIXES = (b".debug", b".zdebug", b".stab", b".gnu.debuglto")
+
+# Format of the ELF header after e_ident (from e_type to e_shstrndx), and
+# of the section headers, by class
+EHDR_FORMATS = {
+    ELFCLASS32: "HHIIIIIHHHHHH",
+    ELFCLASS64: "HHIQQQIHHHHHH",
+}
+SHDR_FORMATS = {
+    ELFCLASS32: "IIIIIIIIII",
+    ELFCLASS64: "IIQQQQIIQQ",
+}
+
+
+# Returns the name of a section, from the offset of the section names
+# string table in buf.
+def get_name(buf, strtab, offset):
+    start = strtab + offset
+    end = buf.find(b"\0", start)
+    if end < 0:
+        raise ValueError("unterminated section name")
+    return buf[start:end]
+
+
+# Returns the list of the (name, type, flags, size, link) of the
+# sections of the ELF file which contents are buf (a bytes-like object,
+# e.g. a mmap), or None if it is not an ELF file. Raises ValueError if
+# the ELF file is truncated or invalid.
+def parse_sections(buf):
+    if len(buf) < 16 or buf[0:4] != ELF_MAGIC:
+        return None
+    elfclass = ord(buf[4:5])
+    elfdata = ord(buf[5:6])
+    if elfclass not in EHDR_FORMATS or elfdata not in [ELFDATA2LSB, ELFDATA2MSB]:
+        raise ValueError("unknown ELF class or data encoding")
+    endian = "<" if elfdata == ELFDATA2LSB else ">"
+    ehdr = struct.Struct(endian + EHDR_FORMATS[elfclass])
+    shdr = struct.Struct(endian + SHDR_FORMATS[elfclass])
+    try:
+        (_, _, _, _, _, shoff, _, _, _, _, shentsize, shnum,
+         shstrndx) = ehdr.unpack_from(buf, 16)
+        if shoff == 0:
+            return []
+        if shentsize < shdr.size:
+            raise ValueError("invalid section header size")
+        # With many sections, their number and the index of the names
+        # are in the first section header
+        first = shdr.unpack_from(buf, shoff)
+        if shnum == 0:
+            shnum = first[5]
+        if shstrndx == SHN_XINDEX:
+            shstrndx = first[6]
+        if shoff + shnum * shentsize > len(buf) or shstrndx >= shnum:
+            raise ValueError("section headers out of the file")
+        headers = [shdr.unpack_from(buf, shoff + i * shentsize) for i in range(shnum)]
+    except struct.error as e:
+        raise ValueError(str(e))
+    strtab = headers[shstrndx][4]
+    return [(get_name(buf, strtab, h[0]), h[1], h[2], h[5], h[6]) for h in headers]
+
+
+# Returns the category (see CATEGORIES) of a section, given the
+# indexes of the string tables of the symbol tables.
+def get_category(index, section, symstrtabs):
+    name, shtype, flags, _, _ = section
+    if name.startswith(DEBUG_PREFIXES):
+        return "debug"
+    if shtype == SHT_SYMTAB or index in symstrtabs:
+        return "symtab"
+    if not flags & SHF_ALLOC:
+        return "other"
+    if shtype == SHT_NOBITS:
+        return "bss"
+    if flags & SHF_EXECINSTR:
+        return "text"
+    if flags & SHF_WRITE:
+        return "data"
+    return "rodata"
+
+
+# Returns the dict of the size of the sections of each category (see
+# CATEGORIES) of the ELF file in path, or None if it is not an ELF file.
+# Raises ValueError if the ELF file is truncated or invalid.
+def get_elf_sizes(path):
+    with open(path, "rb") as f:
+        if f.read(4) != ELF_MAGIC:
+            return None
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            sections = parse_sections(m)
+        finally:
+            m.close()
+    sizes = dict((c, 0) for c in CATEGORIES)
+    symstrtabs = set(s[4] for s in sections if s[1] == SHT_SYMTAB)
+    for i, s in enumerate(sections):
+        if s[1] == SHT_NULL:
+            continue
+        sizes[get_category(i, s, symstrtabs)] += s[3]
+    return sizes
@@ -0,0 +1,174 @@
+# Scanner of the package directories of the Buildroot tree. Each
+# directory is listed only once, and all the facts about a package that
+# can be found in its directory (infrastructures, upstream URL, hash
+# file, patches, files checked by check-package, CPE vendor) are gathered
+# from that single listing, e.g.:
+#
+#   import pkgscan
+#   for pkg in pkgscan.scan_packages():
+#       print(pkg.name, pkg.url, pkg.patch_count)
+
+import collections
+import os
+import re
+
+# Sub-directories of the Buildroot tree that contain the packages
+SCAN_SUBDIRS = ["boot", "linux", "package", "toolchain"]
+
+# The .mk files which are not packages, relative to the top directory
+SCAN_EXCLUDES = re.compile("|".join([
+    r"boot/common\.mk",
+    r"linux/linux-ext-.*\.mk",
+    r"package/freescale-imx/freescale-imx\.mk",
+    r"package/gcc/gcc\.mk",
+    r"package/gstreamer/gstreamer\.mk",
+    r"package/gstreamer1/gstreamer1\.mk",
+    r"package/gtk2-themes/gtk2-themes\.mk",
+    r"package/matchbox/matchbox\.mk",
+    r"package/opengl/opengl\.mk",
+    r"package/qt5/qt5\.mk",
+    r"package/x11r7/x11r7\.mk",
+    r"package/doc-asciidoc\.mk",
+    r"package/pkg-.*\.mk",
+    r"package/nvidia-tegra23/nvidia-tegra23\.mk",
+    r"toolchain/toolchain-external/pkg-toolchain-external\.mk",
+    r"toolchain/toolchain-external/toolchain-external\.mk",
+    r"toolchain/toolchain\.mk",
+    r"toolchain/helpers\.mk",
+    r"toolchain/toolchain-wrapper\.mk",
+]))
+
+INFRA_RE = re.compile(r"\$\(eval \$\(([a-z-]*)-package\)\)")
+URL_RE = re.compile(r"\s*https?://\S*\s*$")
+CPE_VENDOR_RE = re.compile(r"^([A-Z0-9_]+)_CPE_VENDOR\s*=\s*(\S+)\s*$")
+
+# The facts about a package:
+# - name: the name of the package;
+# - path: the path of its .mk file, below the top directory given to
+#   scan_packages();
+# - infras: the tuple of its ("target" or "host", infrastructure);
+# - has_config: whether it has a Config.* file;
+# - url: the upstream URL in its Config.* file, or None;
+# - has_hash: whether it has a .hash file;
+# - patch_count: the number of patches in its directory, searched
+#   recursively;
+# - check_files: the tuple of the .mk, .hash and Config.in files in its
+#   directory (searched recursively), relative to the top directory,
+#   i.e. the files that check-package checks;
+# - cpe_vendor: the CPE vendor of the package (the <PKG>_CPE_VENDOR
+#   variable of its .mk file), or None.
+PackageInfo = collections.namedtuple("PackageInfo", ["name", "path", "infras", "has_config", "url",
+                                                     "has_hash", "patch_count", "check_files",
+                                                     "cpe_vendor"])
+
+
+def is_check_file(fname):
+    return fname.endswith(".mk") or fname.endswith(".hash") or fname in ["Config.in", "Config.in.host"]
+
+
+# Lists the directory path (relpath below the top directory), and its
+# sub-directories, appending to candidates the packages found in them, in
+# the order of os.walk(). A candidate is a list of its name, its path, its
+# Config.* files, and of whether it has a hash file, and the patch count
+# and check files of its directory (filled in once its sub-directories
+# are listed).
+# Returns the patch count and check files of path.
+def scan_dir(path, relpath, names, candidates):
+    patch_count = 0
+    check_files = []
+    configs = []
+    hashes = set()
+    mks = []
+    subdirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.endswith(".patch"):
+                patch_count += 1
+            if entry.is_dir():
+                # Like os.walk(), do not follow the symlinks to directories
+                if not entry.is_symlink():
+                    subdirs.append(entry)
+                continue
+            if is_check_file(entry.name):
+                check_files.append(os.path.join(relpath, entry.name))
+            if entry.name.startswith("Config."):
+                configs.append(entry.path)
+            elif entry.name.endswith(".hash") and entry.is_file():
+                hashes.add(entry.name[:-5])
+            elif entry.name.endswith(".mk"):
+                mks.append(entry)
+
+    own = []
+    for entry in mks:
+        name = entry.name[:-3]
+        if names and name not in names:
+            continue
+        if SCAN_EXCLUDES.match(os.path.join(relpath, entry.name)):
+            continue
+        own.append([name, entry.path, configs, None, None, None])
+    candidates.extend(own)
+
+    for entry in subdirs:
+        sub_patch_count, sub_check_files = scan_dir(entry.path, os.path.join(relpath, entry.name),
+                                                    names, candidates)
+        patch_count += sub_patch_count
+        check_files.extend(sub_check_files)
+
+    for c in own:
+        c[3:] = [c[0] in hashes, patch_count, tuple(check_files)]
+    return patch_count, check_files
+
+
+# Returns the infrastructures used by the .mk file path of the package
+# name, and its CPE vendor (or None).
+def scan_mk(path, name):
+    infras = []
+    cpe_vendor = None
+    pkgvar = name.upper().replace("-", "_")
+    with open(path) as f:
+        for line in f:
+            m = CPE_VENDOR_RE.match(line)
+            if m and m.group(1) == pkgvar:
+                cpe_vendor = m.group(2)
+                continue
+            m = INFRA_RE.match(line)
+            if not m:
+                continue
+            infra = m.group(1)
+            if infra.startswith("host-"):
+                infras.append(("host", infra[5:]))
+            else:
+                infras.append(("target", infra))
+    return tuple(infras), cpe_vendor
+
+
+# Returns the first upstream URL found in the Config.* files configs, or
+# None.
+def get_url(configs):
+    for config in configs:
+        with open(config) as f:
+            for line in f:
+                if URL_RE.match(line):
+                    return line.strip()
+    return None
+
+
+# Returns the list of the PackageInfo of the packages of the tree in
+# topdir, in the order in which os.walk() finds their .mk file. Only the
+# packages which name is in names (if not empty) are returned, and at
+# most limit packages (if not None).
+def scan_packages(topdir=".", names=None, limit=None):
+    candidates = []
+    with os.scandir(topdir) as it:
+        subdirs = [entry for entry in it if entry.name in SCAN_SUBDIRS and entry.is_dir()]
+    for entry in subdirs:
+        scan_dir(entry.path, entry.name, names, candidates)
+    if limit:
+        candidates = candidates[:limit]
+    # Only the .mk and Config.* files of the packages returned are read
+    packages = []
+    for name, path, configs, has_hash, patch_count, check_files in candidates:
+        infras, cpe_vendor = scan_mk(path, name)
+        packages.append(PackageInfo(name, path, infras, bool(configs), get_url(configs),
+                                    has_hash, patch_count, check_files, cpe_vendor))
+    return packages
@@ -0,0 +1,180 @@
+# Database of the history of the results of pkg-stats, in SQLite. Each
+# run (identified by its commit and date) is added with one row per
+# package, so that the evolution of the packages between runs can be
+# queried without loading the JSON outputs of all the runs, e.g.:
+#
+#   import pkgstatsdb
+#   db = pkgstatsdb.open_db("pkg-stats.db")
+#   pkgstatsdb.add_run(db, json.load(open("pkg-stats.json")))
+#   new = pkgstatsdb.find_run(db)
+#   old = pkgstatsdb.previous_run(db, new)
+#   for row in pkgstatsdb.went_out_of_date(db, old, new):
+#       print(row["name"])
+#
+# The runs are added by 'pkg-stats --history', or imported from JSON
+# outputs with 'pkg-stats-history import'.
+
+import json
+import re
+import sqlite3
+
+# Version of the schema, stored in the user_version of the database
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE runs (
+    id INTEGER PRIMARY KEY,
+    commit_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    packages INTEGER NOT NULL DEFAULT 0,
+    patches INTEGER NOT NULL DEFAULT 0,
+    warnings INTEGER NOT NULL DEFAULT 0,
+    outdated INTEGER NOT NULL DEFAULT 0,
+    cves INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (commit_id, date)
+);
+CREATE INDEX runs_date ON runs (date);
+CREATE TABLE packages (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    infra TEXT,
+    has_license INTEGER NOT NULL,
+    has_license_files INTEGER NOT NULL,
+    has_hash INTEGER NOT NULL,
+    patch_count INTEGER NOT NULL,
+    warnings INTEGER NOT NULL,
+    current_version TEXT,
+    latest_version TEXT,
+    latest_status INTEGER,
+    uptodate INTEGER,
+    url_status TEXT,
+    cves INTEGER NOT NULL,
+    PRIMARY KEY (run, name)
+) WITHOUT ROWID;
+CREATE INDEX packages_name ON packages (name, run);
+"""
+
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+# Opens the database in path, creating it if needed.
+def open_db(path):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0:
+        with db:
+            db.executescript(SCHEMA)
+            db.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+    elif version != SCHEMA_VERSION:
+        raise ValueError("%s: unsupported schema version %d" % (path, version))
+    return db
+
+
+# Returns the row of the packages table for a package of the JSON output
+# of pkg-stats.
+def package_row(run, name, pkg):
+    status, latest, _ = pkg["latest_version"]
+    if not latest:
+        uptodate = None
+    else:
+        uptodate = int(latest == pkg["current_version"])
+    # Like in the statistics, the first infrastructure is the one of
+    # the package
+    infra = pkg["infras"][0][1] if pkg["infras"] else None
+    return (run, name, pkg["path"], infra, pkg["has_license"], pkg["has_license_files"],
+            pkg["has_hash"], pkg["patch_count"], pkg["warnings"], pkg["current_version"],
+            latest, status, uptodate, pkg["url_status"], len(pkg.get("cves", [])))
+
+
+# Adds the run which JSON output (see dump_json() in pkg-stats) is data,
+# replacing the run with the same commit and date if any, and returns
+# its id.
+def add_run(db, data):
+    with db:
+        row = db.execute("SELECT id FROM runs WHERE commit_id = ? AND date = ?",
+                         (data["commit"], data["date"])).fetchone()
+        if row:
+            db.execute("DELETE FROM packages WHERE run = ?", (row["id"],))
+            db.execute("DELETE FROM runs WHERE id = ?", (row["id"],))
+        run = db.execute("INSERT INTO runs (commit_id, date, stats) VALUES (?, ?, ?)",
+                         (data["commit"], data["date"], json.dumps(data["stats"]))).lastrowid
+        db.executemany("INSERT INTO packages VALUES (%s)" % ", ".join(["?"] * 15),
+                       (package_row(run, name, pkg) for name, pkg in data["packages"].items()))
+        # The totals of the run, to list the runs without going through
+        # all their packages
+        db.execute("""UPDATE runs SET (packages, patches, warnings, outdated, cves) =
+                          (SELECT COUNT(*), TOTAL(patch_count), TOTAL(warnings), TOTAL(uptodate = 0), TOTAL(cves)
+                           FROM packages WHERE run = ?)
+                      WHERE id = ?""", (run, run))
+    return run
+
+
+# Returns the runs, oldest first.
+def get_runs(db):
+    return db.execute("""SELECT id, commit_id, date, packages, patches, warnings, outdated, cves
+                         FROM runs ORDER BY date""").fetchall()
+
+
+# Returns the id of the run spec: the latest run of a commit (given by
+# its hash, or a prefix of at least 4 characters), or the latest run at
+# or before a date (YYYY-MM-DD, optionally followed by a time). Returns
+# the latest run if spec is None, and None if no run matches.
+def find_run(db, spec=None):
+    if spec is None:
+        row = db.execute("SELECT id FROM runs ORDER BY date DESC LIMIT 1").fetchone()
+    elif DATE_RE.match(spec):
+        # The dates are stored as 'YYYY-MM-DD HH:MM:SS.ffffff', so a
+        # date alone must include the whole day
+        bound = spec + "~" if len(spec) == 10 else spec
+        row = db.execute("SELECT id FROM runs WHERE date <= ? ORDER BY date DESC LIMIT 1", (bound,)).fetchone()
+    elif len(spec) >= 4:
+        row = db.execute("SELECT id FROM runs WHERE commit_id LIKE ? ORDER BY date DESC LIMIT 1",
+                         (spec.replace("%", "").replace("_", "") + "%",)).fetchone()
+    else:
+        row = None
+    return row["id"] if row else None
+
+
+# Returns the id of the run before the run, or None.
+def previous_run(db, run):
+    row = db.execute("""SELECT id FROM runs WHERE date < (SELECT date FROM runs WHERE id = ?)
+                        ORDER BY date DESC LIMIT 1""", (run,)).fetchone()
+    return row["id"] if row else None
+
+
+# Returns the rows of the packages which were up-to-date in the run old,
+# and are not in the run new.
+def went_out_of_date(db, old, new):
+    return db.execute("""SELECT n.name, n.current_version, n.latest_version,
+                                o.current_version AS old_version
+                         FROM packages o JOIN packages n ON n.run = ? AND n.name = o.name
+                         WHERE o.run = ? AND o.uptodate = 1 AND n.uptodate = 0
+                         ORDER BY n.name""", (new, old)).fetchall()
+
+
+# Returns the rows of the packages which have more patches in the run new
+# than in the run old, the biggest growth first.
+def patch_growth(db, old, new):
+    return db.execute("""SELECT n.name, o.patch_count AS old, n.patch_count AS new
+                         FROM packages o JOIN packages n ON n.run = ? AND n.name = o.name
+                         WHERE o.run = ? AND n.patch_count > o.patch_count
+                         ORDER BY n.patch_count - o.patch_count DESC, n.name""", (new, old)).fetchall()
+
+
+# Returns the rows of the packages which have more check-package warnings
+# in the run new than in the run old, the biggest regression first.
+def warning_regressions(db, old, new):
+    return db.execute("""SELECT n.name, o.warnings AS old, n.warnings AS new
+                         FROM packages o JOIN packages n ON n.run = ? AND n.name = o.name
+                         WHERE o.run = ? AND n.warnings > o.warnings
+                         ORDER BY n.warnings - o.warnings DESC, n.name""", (new, old)).fetchall()
+
+
+# Returns the rows of a package in all the runs, oldest first.
+def package_history(db, name):
+    return db.execute("""SELECT runs.commit_id, runs.date, packages.*
+                         FROM packages JOIN runs ON runs.id = packages.run
+                         WHERE name = ? ORDER BY runs.date""", (name,)).fetchall()
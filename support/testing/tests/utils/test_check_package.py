@@ -8,6 +8,7 @@ The make target ('make check-package') is already used by the job
 """
 import os
 import subprocess
+import sys
 import unittest
 
 import infra
@@ -201,3 +202,35 @@ class TestCheckPackage(unittest.TestCase):
         self.assert_file_was_processed(m)
         self.assert_warnings_generated_for_file(m)
         self.assertIn("{}:1: should be 80 hashes (http://nightly.buildroot.org/#writing-rules-mk)".format(abs_file), w)
+
+
+class TestCheckPackageEngine(unittest.TestCase):
+    """Test the check-package engine imported as a module, as used by other
+    scripts (e.g. pkg-stats)."""
+
+    @classmethod
+    def setUpClass(cls):
+        sys.path.append(infra.basepath("utils"))
+        import checkpackagelib.engine
+        cls.engine = checkpackagelib.engine
+
+    def test_check_file(self):
+        abs_path = infra.filepath("tests/utils/br2-external")
+
+        # in-tree files are filtered by their path relative to the base dir
+        warnings, nlines = self.engine.check_file(os.path.join(abs_path, "Config.in"))
+        self.assertIsNone(warnings)
+        self.assertEqual(nlines, 0)
+
+        abs_file = os.path.join(abs_path, "Config.in")
+        warnings, nlines = self.engine.check_file(abs_file, intree_only=False)
+        self.assertEqual(nlines, 1)
+        self.assertIn(self.engine.CheckWarning(abs_file, None, "EmptyLastLine",
+                                               ["{}:1: empty line at end of file".format(abs_file)]),
+                      warnings)
+
+        abs_file = os.path.join(abs_path, "package/external/external.mk")
+        warnings, _ = self.engine.check_file(abs_file, intree_only=False, include_list=["PackageHeader"])
+        self.assertEqual([(w.lineno, w.function) for w in warnings], [(1, "PackageHeader")])
+        self.assertEqual(warnings[0].messages[0],
+                         "{}:1: should be 80 hashes (http://nightly.buildroot.org/#writing-rules-mk)".format(abs_file))
@@ -0,0 +1,531 @@
+"""Test cases for support/scripts/pkg-stats.
+
+It does not inherit from infra.basetest.BRTest and therefore does not generate
+a logfile. Only when the tests fail there will be output to the console.
+
+The URL checker is tested against a local stub HTTP server, so the tests do
+not need network access.
+"""
+import gzip
+import http.server
+import importlib.machinery
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import infra
+
+
+def load_pkg_stats():
+    """Import the pkg-stats script as a module."""
+    # pkg-stats imports the modules next to it
+    if infra.basepath("support/scripts") not in sys.path:
+        sys.path.append(infra.basepath("support/scripts"))
+    loader = importlib.machinery.SourceFileLoader("pkg_stats", infra.basepath("support/scripts/pkg-stats"))
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    # The functions run in a multiprocessing pool must be found by name
+    sys.modules[loader.name] = module
+    loader.exec_module(module)
+    return module
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Answer the requests according to the path:
+    - /ok: 200 to HEAD and GET requests;
+    - /nohead: 405 to HEAD requests, 206 to ranged GET requests;
+    - /missing: 404 to all requests;
+    - /slow: 200 after 5 seconds.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def answer(self, get):
+        self.server.requests.append((self.command, self.path, self.client_address))
+        if self.path == "/slow":
+            time.sleep(5)
+        if self.path == "/missing" or (self.path == "/nohead" and not get):
+            code = 404 if self.path == "/missing" else 405
+        elif self.path == "/nohead":
+            code = 206 if self.headers.get("Range") == "bytes=0-0" else 200
+        else:
+            code = 200
+        self.send_response(code)
+        self.send_header("Content-Length", "1" if get else "0")
+        self.end_headers()
+        if get:
+            self.wfile.write(b"x")
+
+    def do_HEAD(self):
+        self.answer(False)
+
+    def do_GET(self):
+        self.answer(True)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPkgStatsTimings(unittest.TestCase):
+    """Test the instrumentation of the phases of pkg-stats."""
+
+    def test_timings(self):
+        pkg_stats = load_pkg_stats()
+        timings = pkg_stats.Timings()
+        with timings.phase("sleep"):
+            time.sleep(0.2)
+        with self.assertRaises(ValueError):
+            with timings.phase("error"):
+                raise ValueError()
+        for i in range(21):
+            timings.add_package("check", "pkg%d" % i, i / 10.0)
+        data = json.loads(json.dumps(timings.as_dict()))
+        self.assertEqual([p["name"] for p in data["phases"]], ["sleep", "error"])
+        self.assertGreaterEqual(data["phases"][0]["wall"], 0.2)
+        self.assertLess(data["phases"][0]["cpu"], 0.2)
+        self.assertGreater(data["phases"][0]["maxrss"], 0)
+        self.assertEqual(data["packages"]["check"]["median"], 1.0)
+        self.assertEqual(data["packages"]["check"]["slowest"][:2], [["pkg20", 2.0], ["pkg19", 1.9]])
+        self.assertIn("pkg20 2.00s", str(timings))
+
+
+class TestPkgStatsUrls(unittest.TestCase):
+    """Test the checking of the upstream URLs of the packages."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pkg_stats = load_pkg_stats()
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.host = "127.0.0.1:%d" % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+
+    def make_packages(self, paths):
+        packages = []
+        for i, path in enumerate(paths):
+            pkg = self.pkg_stats.Package("pkg%d" % i, "./package/pkg%d/pkg%d.mk" % (i, i))
+            pkg.url = "http://%s%s" % (self.host, path)
+            pkg.url_status = "Found"
+            packages.append(pkg)
+        return packages
+
+    def test_status(self):
+        packages = self.make_packages(["/ok", "/nohead", "/missing"])
+        packages[2].url_status = "Missing"
+        packages.append(self.make_packages(["/missing"])[0])
+        self.pkg_stats.check_package_urls(packages)
+        self.assertEqual([p.url_status for p in packages],
+                         ["Ok", "Ok", "Missing", "Invalid(404)"])
+        self.assertIn(("GET", "/nohead"), [r[:2] for r in self.server.requests])
+        self.assertNotIn(("GET", "/ok"), [r[:2] for r in self.server.requests])
+
+    def test_connection_reuse(self):
+        packages = self.make_packages(["/ok"] * 10)
+        stats = self.pkg_stats.check_package_urls(packages, per_host=2)
+        self.assertEqual([p.url_status for p in packages], ["Ok"] * 10)
+        self.assertEqual(len(stats[self.host].latencies), 10)
+        self.assertLessEqual(len(set(r[2] for r in self.server.requests)), 2)
+
+    def test_deadline(self):
+        packages = self.make_packages(["/slow", "/slow", "/ok"])
+        start = time.time()
+        self.pkg_stats.check_package_urls(packages, per_host=1, deadline=1)
+        self.assertLess(time.time() - start, 4)
+        self.assertEqual([p.url_status for p in packages], ["Invalid(Timeout)"] * 3)
+
+    def test_unreachable(self):
+        packages = self.make_packages(["/ok"])
+        packages[0].url = "http://127.0.0.1:1/ok"
+        stats = self.pkg_stats.check_package_urls(packages)
+        self.assertEqual(packages[0].url_status, "Invalid(Err)")
+        self.assertEqual(stats["127.0.0.1:1"].errors, 1)
+
+
+class ReleaseMonitoringStubHandler(http.server.BaseHTTPRequestHandler):
+    """Answer the requests to the release-monitoring.org API for:
+    - foo, known by the Buildroot distribution, which answers have an
+      ETag;
+    - bar, only found by its name;
+    - baz, not known at all.
+    """
+
+    protocol_version = "HTTP/1.1"
+    answers = {
+        "/api/project/Buildroot/foo": {"id": 1, "version": "1.0"},
+        "/api/projects/?pattern=bar": {"projects": [{"id": 3, "name": "bar-ng", "version": "3.0"},
+                                                    {"id": 2, "name": "bar", "version": "2.0"}]},
+        "/api/projects/?pattern=baz": {"projects": []},
+    }
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.endswith("/foo") and self.headers.get("If-None-Match") == '"foo-1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = json.dumps(self.answers[self.path]).encode() if self.path in self.answers else b"{}"
+        self.send_response(200 if self.path in self.answers else 404)
+        if self.path.endswith("/foo"):
+            self.send_header("ETag", '"foo-1"')
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestPkgStatsReleaseMonitoring(unittest.TestCase):
+    """Test the queries to release-monitoring.org, and their store."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pkg_stats = load_pkg_stats()
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ReleaseMonitoringStubHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url = "http://127.0.0.1:%d" % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.tmpdir = tempfile.mkdtemp()
+        self.store_path = os.path.join(self.tmpdir, "rm-store.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check(self, store):
+        packages = [self.pkg_stats.Package(name, "./package/%s/%s.mk" % (name, name)) for name in ["foo", "bar", "baz"]]
+        self.pkg_stats.check_package_latest_version(packages, store, self.url)
+        return [pkg.latest_version for pkg in packages]
+
+    def test_store(self):
+        expected = [(self.pkg_stats.RM_API_STATUS_FOUND_BY_DISTRO, "1.0", 1),
+                    (self.pkg_stats.RM_API_STATUS_FOUND_BY_PATTERN, "2.0", 2),
+                    (self.pkg_stats.RM_API_STATUS_NOT_FOUND, None, None)]
+        store = self.pkg_stats.ReleaseMonitoringStore(self.store_path, 3600)
+        self.assertEqual(self.check(store), expected)
+        self.assertEqual(len(self.server.requests), 5)
+        store.save()
+
+        # Fresh responses are reused without any request
+        self.server.requests = []
+        store = self.pkg_stats.ReleaseMonitoringStore(self.store_path, 3600)
+        self.assertEqual(self.check(store), expected)
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(store.counts["stored"], 5)
+
+        # Expired responses are revalidated
+        store = self.pkg_stats.ReleaseMonitoringStore(self.store_path, 0)
+        self.assertEqual(self.check(store), expected)
+        self.assertIn(("/api/project/Buildroot/foo", '"foo-1"'), self.server.requests)
+        self.assertEqual((store.counts["revalidated"], store.counts["fetched"]), (1, 4))
+
+    def test_offline(self):
+        store = self.pkg_stats.ReleaseMonitoringStore(self.store_path, 0, offline=True)
+        self.assertEqual([r[0] for r in self.check(store)], [self.pkg_stats.RM_API_STATUS_ERROR] * 3)
+        self.assertEqual(store.counts["missing"], 3)
+
+        self.pkg_stats.ReleaseMonitoringStore(self.store_path, 0).save()
+        store = self.pkg_stats.ReleaseMonitoringStore(self.store_path, 0)
+        self.check(store)
+        store.save()
+        self.server.requests = []
+        store = self.pkg_stats.ReleaseMonitoringStore(self.store_path, 0, offline=True)
+        self.assertEqual(self.check(store)[0], (self.pkg_stats.RM_API_STATUS_FOUND_BY_DISTRO, "1.0", 1))
+        self.assertEqual(self.server.requests, [])
+
+
+class TestPkgStatsScan(unittest.TestCase):
+    """Test the scanner of the package directories, used by pkg-stats."""
+
+    files = {
+        "package/Config.in": "",
+        "package/pkg-generic.mk": "",
+        "package/foo/Config.in": "config BR2_PACKAGE_FOO\n\thelp\n\n\t  http://foo.org/\n",
+        "package/foo/foo.mk": "FOO_CPE_VENDOR = foo_project\n$(eval $(autotools-package))\n$(eval $(host-autotools-package))\n",
+        "package/foo/foo.hash": "",
+        "package/foo/0001-fix.patch": "",
+        "package/foo/1.0/0002-fix.patch": "",
+        "package/bar/Config.in.host": "config BR2_PACKAGE_HOST_BAR\n",
+        "package/bar/bar.mk": "$(eval $(host-generic-package))\n",
+        "package/bar/baz/baz.mk": "$(eval $(generic-package))\n",
+        "system/system.mk": "",
+    }
+
+    def setUp(self):
+        load_pkg_stats()
+        import pkgscan
+        self.pkgscan = pkgscan
+        self.topdir = tempfile.mkdtemp()
+        for fname, contents in self.files.items():
+            path = os.path.join(self.topdir, fname)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(contents)
+
+    def tearDown(self):
+        shutil.rmtree(self.topdir)
+
+    def test_scan(self):
+        pkgs = dict((p.name, p) for p in self.pkgscan.scan_packages(self.topdir))
+        self.assertEqual(sorted(pkgs), ["bar", "baz", "foo"])
+        foo = pkgs["foo"]
+        self.assertEqual(foo.path, os.path.join(self.topdir, "package/foo/foo.mk"))
+        self.assertEqual(foo.infras, (("target", "autotools"), ("host", "autotools")))
+        self.assertEqual((foo.has_config, foo.url, foo.has_hash, foo.patch_count), (True, "http://foo.org/", True, 2))
+        self.assertEqual(sorted(foo.check_files), ["package/foo/Config.in", "package/foo/foo.hash", "package/foo/foo.mk"])
+        self.assertEqual(foo.cpe_vendor, "foo_project")
+        bar = pkgs["bar"]
+        self.assertEqual((bar.has_config, bar.url, bar.has_hash, bar.patch_count), (True, None, False, 0))
+        self.assertEqual(sorted(bar.check_files), ["package/bar/Config.in.host", "package/bar/bar.mk", "package/bar/baz/baz.mk"])
+        self.assertEqual(pkgs["baz"].has_config, False)
+        self.assertEqual(pkgs["baz"].cpe_vendor, None)
+
+    def test_filter(self):
+        pkgs = self.pkgscan.scan_packages(self.topdir, ["baz", "foo", "pkg-generic"])
+        self.assertEqual(sorted(p.name for p in pkgs), ["baz", "foo"])
+        self.assertEqual(len(self.pkgscan.scan_packages(self.topdir, limit=2)), 2)
+
+
+class TestPkgStatsCve(unittest.TestCase):
+    """Test the matching of the packages against the NVD feeds."""
+
+    def setUp(self):
+        self.pkg_stats = load_pkg_stats()
+        import cve
+        self.cve = cve
+        self.nvd_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.nvd_path)
+
+    def write_feed(self, name, cves):
+        items = []
+        for cve_id, matches in cves:
+            cpe_match = []
+            for cpe, ranges in matches:
+                m = {"vulnerable": True, "cpe23Uri": "cpe:2.3:a:%s:*:*:*:*:*:*:*" % cpe}
+                m.update(ranges)
+                cpe_match.append(m)
+            items.append({"cve": {"CVE_data_meta": {"ID": cve_id}},
+                          "configurations": {"nodes": [{"operator": "AND", "children": [
+                              {"operator": "OR", "cpe_match": cpe_match}]}]}})
+        with gzip.open(os.path.join(self.nvd_path, "nvdcve-1.1-%s.json.gz" % name), "wt") as f:
+            json.dump({"CVE_data_type": "CVE", "CVE_Items": items}, f, indent=2)
+
+    def test_match(self):
+        self.write_feed("2019", [
+            ("CVE-2019-0001", [("foo:foo:1.2", {})]),
+            ("CVE-2019-0002", [("foo:foo:*", {"versionStartIncluding": "1.0", "versionEndExcluding": "1.10"})]),
+            ("CVE-2019-0003", [("foo:foo:-", {"versionEndIncluding": "1.2"}), ("bar:bar:*", {})]),
+            ("CVE-2019-0004", [("foo:foo:*", {"versionStartExcluding": "1.2"})]),
+            ("CVE-2019-0005", [("foo:foo:1.2:rc1", {})]),
+        ])
+        self.write_feed("modified", [("CVE-2019-0001", [("foo:foo:1.3", {})])])
+        # Make items straddle the read chunks
+        self.cve.READ_SIZE = 64
+        try:
+            index = self.cve.CVEIndex(self.nvd_path, ["foo"])
+        finally:
+            self.cve.READ_SIZE = 1 << 20
+        self.assertEqual(index.feeds, ["nvdcve-1.1-2019.json.gz", "nvdcve-1.1-modified.json.gz"])
+        self.assertEqual(index.ncves, 5)
+        self.assertEqual(index.match("foo", "1.2"), ["CVE-2019-0002", "CVE-2019-0003"])
+        self.assertEqual(index.match("foo", "1.2rc1"), ["CVE-2019-0002", "CVE-2019-0004", "CVE-2019-0005"])
+        self.assertEqual(index.match("foo", "1.10"), ["CVE-2019-0004"])
+        self.assertEqual(index.match("foo", "1.3"), ["CVE-2019-0001", "CVE-2019-0002", "CVE-2019-0004"])
+        self.assertEqual(index.match("bar", "1.0"), [])
+
+    def test_index(self):
+        self.write_feed("2018", [("CVE-2018-0001", [("foo:foo:*", {})])])
+        self.write_feed("2019", [("CVE-2019-0001", [("bar:bar:*", {})])])
+        index = self.cve.CVEIndex(self.nvd_path)
+        self.assertEqual(len(index.parsed), 2)
+        index = self.cve.CVEIndex(self.nvd_path)
+        self.assertEqual(index.parsed, [])
+        self.assertEqual(index.match("bar", "1.0"), ["CVE-2019-0001"])
+        self.write_feed("2019", [("CVE-2019-0001", [("bar:bar:*", {"versionEndExcluding": "1.0"})])])
+        index = self.cve.CVEIndex(self.nvd_path)
+        self.assertEqual(index.parsed, ["nvdcve-1.1-2019.json.gz"])
+        self.assertEqual(index.match("bar", "1.0"), [])
+        self.assertEqual(index.match("foo", "1.0"), ["CVE-2018-0001"])
+
+    def test_vendor(self):
+        self.write_feed("2019", [
+            ("CVE-2019-0001", [("foo:foo:*", {})]),
+            ("CVE-2019-0002", [("other:foo:*", {})]),
+            ("CVE-2019-0003", [("foo:bar:*", {})]),
+        ])
+        index = self.cve.CVEIndex(self.nvd_path, ["foo"])
+        self.assertEqual(index.match("foo", "1.0", "foo"), ["CVE-2019-0001"])
+        self.assertEqual(index.match("foo", "1.0", "other"), ["CVE-2019-0002"])
+        self.assertEqual(index.match("foo", "1.0", "unknown"), [])
+        self.assertEqual(index.match("foo", "1.0"), ["CVE-2019-0001", "CVE-2019-0002"])
+        packages = []
+        for vendor in ["foo", None]:
+            pkg = self.pkg_stats.Package("foo", "./package/foo/foo.mk")
+            pkg.current_version = "1.0"
+            pkg.cpe_vendor = vendor
+            packages.append(pkg)
+        self.pkg_stats.check_package_cves(self.nvd_path, packages)
+        self.assertEqual((packages[0].cves, packages[0].cves_unverified), (["CVE-2019-0001"], False))
+        self.assertEqual((packages[1].cves, packages[1].cves_unverified), (["CVE-2019-0001", "CVE-2019-0002"], True))
+
+
+class TestPkgStatsHistory(unittest.TestCase):
+    """Test the database of the history of the results of pkg-stats."""
+
+    def setUp(self):
+        self.pkg_stats = load_pkg_stats()
+        import pkgstatsdb
+        self.pkgstatsdb = pkgstatsdb
+        self.tmpdir = tempfile.mkdtemp()
+        self.dbpath = os.path.join(self.tmpdir, "history.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def add_run(self, db, commit, date, packages):
+        pkgs = list()
+        for name, (version, latest, patches, warnings) in packages.items():
+            pkg = self.pkg_stats.Package(name, "./package/%s/%s.mk" % (name, name))
+            pkg.infras = [("target", "generic")]
+            pkg.current_version = version
+            pkg.latest_version = (self.pkg_stats.RM_API_STATUS_FOUND_BY_DISTRO, latest, 1)
+            pkg.patch_count = patches
+            pkg.warnings = warnings
+            pkgs.append(pkg)
+        stats = self.pkg_stats.calculate_stats(pkgs)
+        return self.pkgstatsdb.add_run(db, self.pkg_stats.get_json_data(pkgs, stats, date, commit))
+
+    def test_history(self):
+        db = self.pkgstatsdb.open_db(self.dbpath)
+        run1 = self.add_run(db, "1111aaaa", "2020-01-01 10:00:00",
+                            {"foo": ("1.0", "1.0", 1, 0), "bar": ("2.0", "2.0", 0, 1), "baz": ("3.0", None, 0, 0)})
+        run2 = self.add_run(db, "2222bbbb", "2020-02-01 10:00:00",
+                            {"foo": ("1.0", "1.1", 3, 0), "bar": ("2.1", "2.1", 0, 2), "baz": ("3.0", "3.1", 0, 0)})
+        # Adding a run again replaces it
+        run2 = self.add_run(db, "2222bbbb", "2020-02-01 10:00:00",
+                            {"foo": ("1.0", "1.1", 2, 0), "bar": ("2.1", "2.1", 0, 3), "baz": ("3.0", "3.1", 0, 0)})
+        db.close()
+
+        db = self.pkgstatsdb.open_db(self.dbpath)
+        self.assertEqual(self.pkgstatsdb.find_run(db), run2)
+        self.assertEqual(self.pkgstatsdb.find_run(db, "1111"), run1)
+        self.assertEqual(self.pkgstatsdb.find_run(db, "2020-01-31"), run1)
+        self.assertEqual(self.pkgstatsdb.find_run(db, "2019-12-31"), None)
+        self.assertEqual(self.pkgstatsdb.previous_run(db, run2), run1)
+        self.assertEqual([tuple(r) for r in self.pkgstatsdb.get_runs(db)],
+                         [(run1, "1111aaaa", "2020-01-01 10:00:00", 3, 1, 1, 0, 0),
+                          (run2, "2222bbbb", "2020-02-01 10:00:00", 3, 2, 3, 2, 0)])
+        self.assertEqual([r["name"] for r in self.pkgstatsdb.went_out_of_date(db, run1, run2)], ["foo"])
+        self.assertEqual([tuple(r) for r in self.pkgstatsdb.patch_growth(db, run1, run2)], [("foo", 1, 2)])
+        self.assertEqual([tuple(r) for r in self.pkgstatsdb.warning_regressions(db, run1, run2)], [("bar", 1, 3)])
+        self.assertEqual([r["current_version"] for r in self.pkgstatsdb.package_history(db, "bar")], ["2.0", "2.1"])
+        db.close()
+
+        out = subprocess.check_output([infra.basepath("support/scripts/pkg-stats-history"), "-d", self.dbpath,
+                                       "-J", "warnings", "--old", "2020-01-01"], universal_newlines=True)
+        self.assertEqual(json.loads(out), [{"name": "bar", "old": 1, "new": 3}])
+
+
+class TestPkgStatsMerge(unittest.TestCase):
+    """Test the JSON outputs, the sharding of the packages, and the merge of the shards."""
+
+    def setUp(self):
+        self.pkg_stats = load_pkg_stats()
+        self.tmpdir = tempfile.mkdtemp()
+        self.packages = list()
+        for i in range(10):
+            pkg = self.pkg_stats.Package("pkg%d" % i, "./package/pkg%d/pkg%d.mk" % (i, i))
+            pkg.infras = [("target", "generic"), ("host", "generic")]
+            pkg.has_hash = i % 2 == 0
+            pkg.patch_count = i
+            pkg.current_version = "1.%d" % i
+            pkg.latest_version = (self.pkg_stats.RM_API_STATUS_FOUND_BY_DISTRO, "1.5", i)
+            pkg.cves = ["CVE-2020-%04d" % i] if i < 3 else []
+            self.packages.append(pkg)
+        # Two packages with the same name, in the same JSON entry
+        pkg = self.pkg_stats.Package("pkg9", "./package/pkg9/pkg9/pkg9.mk")
+        pkg.infras = []
+        self.packages.append(pkg)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def dump(self, packages, fname, commit="abc"):
+        path = os.path.join(self.tmpdir, fname)
+        self.pkg_stats.dump_json(packages, self.pkg_stats.calculate_stats(packages), "2020-01-01 00:00:00", commit, path)
+        return path
+
+    def test_outputs(self):
+        timings = self.pkg_stats.Timings()
+        with timings.phase("test"):
+            pass
+        for packages, t in [(self.packages, None), (self.packages, timings), ([], None)]:
+            stats = self.pkg_stats.calculate_stats(packages)
+            data = self.pkg_stats.get_json_data(packages, stats, "2020-01-01 00:00:00", "abc")
+            if t:
+                data["timings"] = t.as_dict()
+            path = os.path.join(self.tmpdir, "out.json")
+            self.pkg_stats.dump_json(packages, stats, "2020-01-01 00:00:00", "abc", path, t)
+            with open(path) as f:
+                self.assertEqual(f.read(), json.dumps(data, indent=2, separators=(',', ': ')) + "\n")
+
+            path = os.path.join(self.tmpdir, "out.jsonl")
+            self.pkg_stats.dump_json_lines(packages, stats, "2020-01-01 00:00:00", "abc", path, t)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(records[0], {"type": "run", "commit": "abc", "date": "2020-01-01 00:00:00"})
+            self.assertEqual(dict((r.pop("name"), r) for r in records[1:-1] if r.pop("type") == "package"),
+                             json.loads(json.dumps(data["packages"])))
+            last = {"type": "stats", "stats": json.loads(json.dumps(data["stats"]))}
+            if t:
+                last["timings"] = data["timings"]
+            self.assertEqual(records[-1], last)
+
+    def test_merge(self):
+        shards = [self.pkg_stats.get_shard(self.packages, (i, 3)) for i in [1, 2, 3]]
+        self.assertEqual(sorted(pkg.path for shard in shards for pkg in shard), sorted(pkg.path for pkg in self.packages))
+        self.assertEqual([pkg.path for pkg in shards[0]], [pkg.path for pkg in self.pkg_stats.get_shard(self.packages, (1, 3))])
+        self.assertEqual(sorted(len([pkg for pkg in shard if pkg.name == "pkg9"]) for shard in shards), [0, 0, 2])
+
+        files = [self.dump(shard, "shard%d.json" % i) for i, shard in enumerate(shards)]
+        packages, date, commit = self.pkg_stats.load_json(files)
+        merged = self.dump(packages, "merged.json")
+        with open(self.dump(self.packages, "full.json")) as f:
+            full = json.load(f)
+        with open(merged) as f:
+            self.assertEqual(json.load(f)["packages"], full["packages"])
+        self.assertEqual(self.pkg_stats.calculate_stats(packages)["pkg-cves"], 3)
+
+    def test_merge_errors(self):
+        files = [self.dump(self.packages[:5], "a.json"), self.dump(self.packages[4:], "b.json")]
+        self.assertRaises(ValueError, self.pkg_stats.load_json, files)
+        files = [self.dump(self.packages[:5], "a.json"), self.dump(self.packages[5:], "b.json", "def")]
+        self.assertRaises(ValueError, self.pkg_stats.load_json, files)
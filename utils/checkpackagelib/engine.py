@@ -0,0 +1,127 @@
+# See utils/checkpackagelib/readme.txt before editing this file.
+# The engine of check-package, that can also be imported by other scripts:
+#
+#   from checkpackagelib.engine import check_file
+#   warnings, nlines = check_file("package/foo/foo.mk")
+#   for warning in warnings or []:
+#       print(warning.messages[0])
+import collections
+import inspect
+import os
+import re
+import six
+
+import checkpackagelib.lib_config
+import checkpackagelib.lib_hash
+import checkpackagelib.lib_mk
+import checkpackagelib.lib_patch
+
+DEFAULT_MANUAL_URL = "http://nightly.buildroot.org/"
+
+CONFIG_IN_FILENAME = re.compile(r"Config\.\S*$")
+DO_CHECK_INTREE = re.compile("|".join([
+    "Config.in",
+    "arch/",
+    "boot/",
+    "fs/",
+    "linux/",
+    "package/",
+    "system/",
+    "toolchain/",
+    ]))
+DO_NOT_CHECK_INTREE = re.compile("|".join([
+    r"boot/barebox/barebox\.mk$",
+    r"fs/common\.mk$",
+    r"package/doc-asciidoc\.mk$",
+    r"package/pkg-\S*\.mk$",
+    r"toolchain/helpers\.mk$",
+    r"toolchain/toolchain-external/pkg-toolchain-external\.mk$",
+    ]))
+
+# A warning generated by a check function:
+# - filename: the file checked;
+# - lineno: the line served to the check function when it generated the
+#   warning, or None when generated before or after serving the lines;
+# - function: the name of the check function;
+# - messages: the list of messages returned by the check function, the
+#   first one being the warning itself, the next ones more and more
+#   verbose explanations.
+CheckWarning = collections.namedtuple("CheckWarning", ["filename", "lineno", "function", "messages"])
+
+
+def get_lib_from_filename(fname, intree_only=True):
+    """Return the library of check functions for fname, or None if it must
+    be ignored. In-tree (intree_only) file names must be relative to the
+    base dir."""
+    if intree_only:
+        if DO_CHECK_INTREE.match(fname) is None:
+            return None
+        if DO_NOT_CHECK_INTREE.match(fname):
+            return None
+    else:
+        if os.path.basename(fname) == "external.mk" and \
+           os.path.exists(fname[:-2] + "desc"):
+            return None
+    if CONFIG_IN_FILENAME.search(fname):
+        return checkpackagelib.lib_config
+    if fname.endswith(".hash"):
+        return checkpackagelib.lib_hash
+    if fname.endswith(".mk"):
+        return checkpackagelib.lib_mk
+    if fname.endswith(".patch"):
+        return checkpackagelib.lib_patch
+    return None
+
+
+def get_check_functions(lib, include_list=None, exclude_list=None):
+    """Return the list of (name, class) of the check functions of lib."""
+    def is_a_check_function(m):
+        if not inspect.isclass(m):
+            return False
+        # do not call the base class
+        if m.__name__.startswith("_"):
+            return False
+        if include_list and m.__name__ not in include_list:
+            return False
+        if exclude_list and m.__name__ in exclude_list:
+            return False
+        return True
+    return inspect.getmembers(lib, is_a_check_function)
+
+
+def check_file(fname, intree_only=True, manual_url=DEFAULT_MANUAL_URL,
+               include_list=None, exclude_list=None):
+    """Run the check functions on fname, and return a tuple of the list
+    of the CheckWarning generated, and of the number of lines processed.
+    The list is None if the file is ignored."""
+    lib = get_lib_from_filename(fname, intree_only)
+    if not lib:
+        return None, 0
+    objects = [c[1](fname, manual_url) for c in get_check_functions(lib, include_list, exclude_list)]
+    warnings = []
+
+    def add_warnings(cf, lineno, messages):
+        # Avoid the need to use 'return []' at the end of every check function.
+        if messages is not None:
+            warnings.append(CheckWarning(fname, lineno, cf.__class__.__name__, messages))
+
+    for cf in objects:
+        add_warnings(cf, None, cf.before())
+    if six.PY3:
+        f = open(fname, "r", errors="surrogateescape")
+    else:
+        f = open(fname, "r")
+    lastline = ""
+    nlines = 0
+    for lineno, text in enumerate(f.readlines()):
+        nlines += 1
+        for cf in objects:
+            if cf.disable.search(lastline):
+                continue
+            add_warnings(cf, lineno + 1, cf.check_line(lineno + 1, text))
+        lastline = text
+    f.close()
+    for cf in objects:
+        add_warnings(cf, None, cf.after())
+
+    return warnings, nlines